@@ -0,0 +1,94 @@
+"""dataset_store.py
+
+Almacén canónico del dataset procesado (catálogos TESS + Kepler + K2 unidos).
+
+El dataset se guarda una sola vez en `data/processed/exoplanets.parquet`
+(columnar, comprimido con zstd). Las columnas categóricas (`mission` y
+`disposition_norm`) se guardan con codificación de diccionario, de modo que
+las codificaciones numéricas que usan los modelos se derivan directamente del
+diccionario en lugar de volver a parsear un CSV y reajustar `LabelEncoder`s.
+
+Uso:
+    from dataset_store import load_dataset, encode_dataset, encoding_maps
+
+    df = load_dataset()            # columnas categóricas como `category`
+    encoded = encode_dataset(df)   # categorías reemplazadas por sus códigos
+"""
+
+from __future__ import annotations
+import os
+from typing import Dict, Optional
+
+import pandas as pd
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE = os.path.join(HERE, "..", "..", "data", "processed", "exoplanets.parquet")
+
+NUMERIC_COLUMNS = [
+    "ra",
+    "dec",
+    "pl_orbper",
+    "pl_rade",
+    "pl_insol",
+    "pl_eqt",
+    "st_teff",
+    "st_logg",
+    "st_rad",
+    "st_tmag",
+]
+CATEGORICAL_COLUMNS = ["mission", "disposition_norm"]
+COLUMNS = NUMERIC_COLUMNS + CATEGORICAL_COLUMNS
+
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Devuelve una copia con el esquema canónico (float64 + category ordenada)."""
+    missing = [c for c in COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Faltan columnas esperadas en el dataset: {missing}")
+
+    typed = df[COLUMNS].copy()
+    for col in NUMERIC_COLUMNS:
+        typed[col] = typed[col].astype("float64")
+    for col in CATEGORICAL_COLUMNS:
+        # Categorías ordenadas alfabéticamente: mismos códigos que LabelEncoder
+        values = typed[col].astype(str)
+        typed[col] = pd.Categorical(values, categories=sorted(values.unique()))
+    return typed.reset_index(drop=True)
+
+
+def save_dataset(df: pd.DataFrame, path: str = DEFAULT_STORE) -> str:
+    """Guarda el dataset limpio en Parquet y retorna la ruta escrita."""
+    typed = _typed(df)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    typed.to_parquet(
+        path,
+        engine="pyarrow",
+        index=False,
+        compression="zstd",
+        use_dictionary=CATEGORICAL_COLUMNS,
+    )
+    return path
+
+
+def load_dataset(path: str = DEFAULT_STORE, columns: Optional[list] = None) -> pd.DataFrame:
+    """Carga el dataset desde Parquet; las columnas categóricas quedan como `category`."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Dataset procesado no encontrado: {path}")
+    return pd.read_parquet(path, engine="pyarrow", columns=columns)
+
+
+def encoding_maps(df: pd.DataFrame) -> Dict[str, Dict[str, int]]:
+    """Mapas {columna: {categoría: código}} derivados del diccionario de cada columna."""
+    maps = {}
+    for col in df.select_dtypes(include=["category"]).columns:
+        maps[col] = {str(cat): code for code, cat in enumerate(df[col].cat.categories)}
+    return maps
+
+
+def encode_dataset(df: pd.DataFrame) -> pd.DataFrame:
+    """Reemplaza cada columna categórica por sus códigos enteros."""
+    encoded = df.copy()
+    for col in encoded.select_dtypes(include=["category"]).columns:
+        encoded[col] = encoded[col].cat.codes.astype("int64")
+    return encoded
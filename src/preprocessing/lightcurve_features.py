@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""lightcurve_features.py
+
+Extracción por lotes de características de tránsito a partir de curvas de luz
+TESS/Kepler/K2 guardadas localmente en FITS (no descarga nada).
+
+Uso (desde la raíz del repo):
+python src/preprocessing/lightcurve_features.py data/lightcurves \
+  --output data/processed/lightcurve_features.parquet --workers 4 --join
+
+python src/preprocessing/lightcurve_features.py --benchmark 64
+python src/preprocessing/lightcurve_features.py --benchmark 4 --benchmark-case kepler
+
+Cada archivo se abre con `memmap=True` y se procesa en un pool de procesos.
+Por objetivo se ejecuta una búsqueda box-least-squares (BLS) vectorizada sobre
+todos los periodos de prueba a la vez (en bloques) y se obtienen:
+`bls_period` (días), `bls_depth` (flujo relativo), `bls_duration` (horas),
+`bls_snr`, `bls_t0` y `bls_power`.
+
+`join_features` une esas columnas en memoria a las filas del catálogo
+(`dataset_store.load_dataset`) por misión y coordenadas (RA/Dec del
+encabezado FITS). La unión no se guarda en disco y `rf_predict.py` todavía no
+usa estas columnas; `--join` solo reporta cuántas filas del catálogo tienen
+una curva de luz asociada.
+
+La rejilla de periodos escala con la línea base (ver `period_grid`): un
+sector TESS usa ~4 mil periodos, pero una curva Kepler completa (1400 días)
+usa ~250 mil y tarda unos 5 minutos por objetivo en un núcleo. Para acotarlo
+se puede subir `min_duration_hours` o bajar `max_period`; `max_periods`
+recorta la rejilla con un aviso.
+
+`--benchmark N` genera N curvas sintéticas en un directorio temporal
+(`write_synthetic_lightcurve`, la misma función que usan las pruebas de
+`tests/test_lightcurve_features.py`) y reporta el rendimiento en objetivos
+por segundo; `--benchmark-case kepler` usa curvas Kepler de 1400 días.
+"""
+
+from __future__ import annotations
+import argparse
+import glob
+import os
+import tempfile
+import time as _time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+from astropy.io import fits
+from sklearn.neighbors import BallTree
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(HERE, "..", "..", "data", "processed", "lightcurve_features.parquet")
+
+FEATURE_COLUMNS = ["bls_period", "bls_depth", "bls_duration", "bls_snr", "bls_t0", "bls_power"]
+
+# Parámetros por defecto de la búsqueda BLS
+BLS_DEFAULTS: Dict[str, Any] = {
+    "min_period": 0.5,        # días
+    "max_period": 20.0,       # días (se limita a la mitad de la línea base)
+    "qmin": 0.005,            # duración mínima como fracción del periodo
+    "qmax": 0.1,              # duración máxima como fracción del periodo
+    "nbins": 200,             # bins de fase
+    "min_duration_hours": 1.0,# tránsito más corto que fija el paso de la rejilla
+    "oversample": 2.0,
+    "max_periods": None,      # tope opcional de la rejilla (avisa si recorta)
+    "time_bin_minutes": 10.0, # rebinning temporal previo (0 = desactivado)
+    "detrend_window": 1.0,    # días (0 = sin detrending)
+    "chunk": 64,              # periodos procesados a la vez
+}
+
+
+# --- Lectura FITS ---
+
+def _mission_from_header(header) -> str:
+    telescope = str(header.get("TELESCOP", "")).strip().upper()
+    mission = str(header.get("MISSION", "")).strip().upper()
+    if telescope == "TESS" or mission == "TESS":
+        return "TESS"
+    if mission == "K2" or "CAMPAIGN" in header:
+        return "K2"
+    return "Kepler"
+
+
+def read_lightcurve(path: str) -> Dict[str, Any]:
+    """Lee tiempo, flujo y metadatos de un FITS de curva de luz (memoria mapeada).
+
+    Se usa `PDCSAP_FLUX` (o `SAP_FLUX` si no existe) y se descartan los puntos
+    con bandera de calidad distinta de cero o valores no finitos.
+    """
+    with fits.open(path, memmap=True) as hdul:
+        header = hdul[0].header
+        data = hdul[1].data
+        names = [n.upper() for n in data.columns.names]
+
+        flux_col = "PDCSAP_FLUX" if "PDCSAP_FLUX" in names else "SAP_FLUX"
+        quality_col = next((c for c in ("QUALITY", "SAP_QUALITY") if c in names), None)
+
+        # np.array copia solo las columnas necesarias antes de cerrar el mmap
+        t = np.array(data["TIME"], dtype=np.float64)
+        flux = np.array(data[flux_col], dtype=np.float64)
+        quality = np.array(data[quality_col]) if quality_col else np.zeros(t.shape, dtype=np.int32)
+
+        mission = _mission_from_header(header)
+        target_id = header.get("TICID", header.get("KEPLERID"))
+        meta = {
+            "file": os.path.basename(path),
+            "mission": mission,
+            "target_id": int(target_id) if target_id is not None else None,
+            "ra": float(header.get("RA_OBJ", np.nan)),
+            "dec": float(header.get("DEC_OBJ", np.nan)),
+        }
+
+    good = (quality == 0) & np.isfinite(t) & np.isfinite(flux)
+    return {"time": t[good], "flux": flux[good], **meta}
+
+
+# --- Preparación de la curva ---
+
+def _bin_time(t: np.ndarray, flux: np.ndarray, width: float):
+    """Promedia la curva en bins temporales de `width` días."""
+    idx = np.floor((t - t[0]) / width).astype(np.int64)
+    counts = np.bincount(idx)
+    keep = counts > 0
+    t_binned = np.bincount(idx, weights=t)[keep] / counts[keep]
+    f_binned = np.bincount(idx, weights=flux)[keep] / counts[keep]
+    return t_binned, f_binned
+
+
+def _detrend(t: np.ndarray, flux: np.ndarray, window: float) -> np.ndarray:
+    """Divide por una tendencia de medianas por ventana interpoladas linealmente."""
+    idx = np.floor((t - t[0]) / window).astype(np.int64)
+    med = pd.Series(flux).groupby(idx).median().values
+    centers = pd.Series(t).groupby(idx).mean().values
+    return flux / np.interp(t, centers, med)
+
+
+def period_grid(baseline: float, min_period: float, max_period: float, min_duration: float,
+                oversample: float, max_periods: Optional[int] = None) -> np.ndarray:
+    """Rejilla geométrica en frecuencia que escala con la línea base.
+
+    Entre dos frecuencias vecinas el tránsito más corto (`min_duration`, en
+    días) se desfasa a lo largo de toda la línea base como mucho
+    1/`oversample` de su duración: paso relativo min_duration / (baseline * oversample).
+    El número de periodos crece linealmente con la línea base (~4.3 mil para
+    un sector TESS, ~250 mil para una curva Kepler completa de 1400 días).
+    """
+    max_period = min(max_period, baseline / 2.0)
+    if max_period <= min_period:
+        return np.array([], dtype=np.float64)
+    fmin, fmax = 1.0 / max_period, 1.0 / min_period
+    step = min_duration / (baseline * oversample)
+    n = max(2, int(np.ceil(np.log(fmax / fmin) / np.log1p(step))) + 1)
+    if max_periods and n > max_periods:
+        print(f"⚠️ Rejilla de periodos recortada de {n} a {max_periods} "
+              f"(línea base de {baseline:.0f} días): el paso es {n / max_periods:.1f}x más grueso "
+              f"de lo necesario y pueden aparecer alias del periodo")
+        n = max_periods
+    return 1.0 / np.geomspace(fmax, fmin, n)
+
+
+# --- BLS vectorizado ---
+
+def bls_search(t: np.ndarray, flux: np.ndarray, periods: np.ndarray, qmin: float = 0.005,
+               qmax: float = 0.1, nbins: int = 200, chunk: int = 64, min_points: int = 3) -> Dict[str, float]:
+    """Búsqueda BLS (Kovács et al. 2002) vectorizada sobre periodos y fases.
+
+    Para cada bloque de `chunk` periodos se pliega la curva completa de una vez,
+    se acumulan sumas y conteos por bin de fase con `np.bincount` y se evalúan
+    todas las posiciones de la caja con sumas acumuladas (con vuelta de fase).
+    `flux` debe estar normalizado alrededor de 1.
+    """
+    y = flux - flux.mean()
+    N = y.size
+    t_ref = t.min()
+    t_rel = t - t_ref
+    sigma = 1.4826 * np.median(np.abs(y - np.median(y)))
+
+    widths = np.unique(np.clip(np.round(np.geomspace(qmin, qmax, 12) * nbins), 1, nbins // 2)).astype(int)
+    wmax = int(widths.max())
+
+    best = {"power": 0.0, "period": np.nan, "width": 0, "bin": 0, "s": 0.0, "n": 0}
+    for start in range(0, periods.size, chunk):
+        P = periods[start:start + chunk]
+        p = P.size
+
+        # Fase = parte fraccionaria de t·f (floor + resta es ~3x más rápido que np.mod)
+        phase = t_rel[None, :] * (1.0 / P)[:, None]
+        np.subtract(phase, np.floor(phase), out=phase)
+        phase *= nbins
+        bins = phase.astype(np.int64)
+        np.minimum(bins, nbins - 1, out=bins)
+        bins += (np.arange(p, dtype=np.int64) * nbins)[:, None]
+        flat = bins.ravel()
+        S = np.bincount(flat, weights=np.broadcast_to(y, (p, N)).ravel(), minlength=p * nbins).reshape(p, nbins)
+        C = np.bincount(flat, minlength=p * nbins).reshape(p, nbins).astype(np.float64)
+
+        # Sumas acumuladas con las primeras `wmax` columnas repetidas al final (vuelta de fase)
+        zeros = np.zeros((p, 1))
+        cs = np.cumsum(np.hstack([zeros, S, S[:, :wmax]]), axis=1)
+        cc = np.cumsum(np.hstack([zeros, C, C[:, :wmax]]), axis=1)
+
+        for w in widths:
+            s = cs[:, w:w + nbins] - cs[:, :nbins]
+            n = cc[:, w:w + nbins] - cc[:, :nbins]
+            valid = (n >= min_points) & (n < N) & (s < 0)
+            denom = np.where(valid, n * (N - n), 1.0)
+            power = np.where(valid, s * s * N / denom, 0.0)
+            k = int(np.argmax(power))
+            i, b = divmod(k, nbins)
+            if power[i, b] > best["power"]:
+                best = {"power": float(power[i, b]), "period": float(P[i]), "width": int(w),
+                        "bin": int(b), "s": float(s[i, b]), "n": int(n[i, b])}
+
+    if best["n"] == 0:
+        return {col: np.nan for col in FEATURE_COLUMNS}
+
+    s, n, period = best["s"], best["n"], best["period"]
+    depth = -s * N / (n * (N - n))
+    noise = sigma * np.sqrt(1.0 / n + 1.0 / (N - n))
+    return {
+        "bls_period": period,
+        "bls_depth": depth,
+        "bls_duration": best["width"] / nbins * period * 24.0,
+        "bls_snr": depth / noise if noise > 0 else np.nan,
+        "bls_t0": t_ref + (best["bin"] + best["width"] / 2.0) / nbins * period,
+        "bls_power": best["power"] / sigma ** 2 if sigma > 0 else np.nan,
+    }
+
+
+def extract_one(path: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Lee un FITS y retorna su fila de características (None si no es utilizable)."""
+    params = {**BLS_DEFAULTS, **(params or {})}
+    try:
+        lc = read_lightcurve(path)
+    except Exception as e:
+        print(f"⚠️ No se pudo leer {path}: {e}")
+        return None
+
+    t, flux = lc.pop("time"), lc.pop("flux")
+    if t.size < 10:
+        print(f"⚠️ Curva con muy pocos puntos válidos: {path}")
+        return None
+
+    order = np.argsort(t)
+    t, flux = t[order], flux[order] / np.median(flux)
+    if params["time_bin_minutes"]:
+        t, flux = _bin_time(t, flux, params["time_bin_minutes"] / (24.0 * 60.0))
+    if params["detrend_window"]:
+        flux = _detrend(t, flux, params["detrend_window"])
+
+    periods = period_grid(t[-1] - t[0], params["min_period"], params["max_period"],
+                          params["min_duration_hours"] / 24.0, params["oversample"], params["max_periods"])
+    if periods.size == 0:
+        features = {col: np.nan for col in FEATURE_COLUMNS}
+    else:
+        features = bls_search(t, flux, periods, params["qmin"], params["qmax"],
+                              params["nbins"], params["chunk"])
+    return {**lc, "n_points": int(t.size), **features}
+
+
+def find_lightcurves(directory: str):
+    """Lista los FITS de curvas de luz (recursivo) en un directorio."""
+    files = glob.glob(os.path.join(directory, "**", "*.fits"), recursive=True)
+    return sorted(files)
+
+
+def extract_features(paths, workers: Optional[int] = None, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """Procesa varias curvas de luz en paralelo y retorna un DataFrame por objetivo."""
+    paths = list(paths)
+    columns = ["file", "mission", "target_id", "ra", "dec", "n_points"] + FEATURE_COLUMNS
+    if not paths:
+        return pd.DataFrame(columns=columns)
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rows = list(pool.map(extract_one, paths, [params] * len(paths), chunksize=chunksize))
+    return pd.DataFrame([r for r in rows if r is not None], columns=columns)
+
+
+# --- Unión con el catálogo ---
+
+def join_features(catalog: pd.DataFrame, features: pd.DataFrame, max_sep_arcsec: float = 2.0) -> pd.DataFrame:
+    """Agrega las columnas `bls_*` a las filas del catálogo por misión y posición.
+
+    Cada fila del catálogo toma la curva de luz más cercana de su misión si la
+    separación angular es menor que `max_sep_arcsec`; si no, quedan en NaN.
+    """
+    joined = catalog.copy()
+    for col in FEATURE_COLUMNS:
+        joined[col] = np.nan
+
+    missions = joined["mission"].astype(str).values
+    for mission, feats in features.dropna(subset=["ra", "dec"]).groupby("mission"):
+        mask = missions == mission
+        if not mask.any():
+            continue
+        tree = BallTree(np.radians(feats[["dec", "ra"]].values), metric="haversine")
+        dist, ind = tree.query(np.radians(joined.loc[mask, ["dec", "ra"]].values), k=1)
+        sep_arcsec = np.degrees(dist[:, 0]) * 3600.0
+        ok = sep_arcsec <= max_sep_arcsec
+        rows = joined.index[mask][ok]
+        joined.loc[rows, FEATURE_COLUMNS] = feats[FEATURE_COLUMNS].values[ind[ok, 0]]
+    return joined
+
+
+# --- Curvas sintéticas y benchmark ---
+
+def write_synthetic_lightcurve(path: str, period: float, depth: float, duration_hours: float,
+                               t0: float = 1.0, baseline: float = 27.0, cadence_minutes: float = 2.0,
+                               noise: float = 1e-3, target_id: int = 0, mission: str = "TESS",
+                               ra: float = 0.0, dec: float = 0.0, seed: Optional[int] = None) -> str:
+    """Escribe un FITS con el formato de las curvas SPOC/Kepler y un tránsito de caja."""
+    rng = np.random.default_rng(seed)
+    t = 1325.0 + np.arange(0.0, baseline, cadence_minutes / (24.0 * 60.0))
+    flux = 1.0 + noise * rng.standard_normal(t.size)
+    phase = np.mod(t - (1325.0 + t0) + 0.5 * period, period) - 0.5 * period
+    flux[np.abs(phase) < duration_hours / 48.0] -= depth
+    quality = np.zeros(t.size, dtype=np.int32)
+
+    primary = fits.PrimaryHDU()
+    primary.header["TELESCOP"] = "TESS" if mission == "TESS" else "Kepler"
+    primary.header["MISSION"] = mission
+    primary.header["TICID" if mission == "TESS" else "KEPLERID"] = target_id
+    primary.header["RA_OBJ"] = ra
+    primary.header["DEC_OBJ"] = dec
+    table = fits.BinTableHDU.from_columns([
+        fits.Column(name="TIME", format="D", array=t),
+        fits.Column(name="PDCSAP_FLUX", format="E", array=flux.astype(np.float32)),
+        fits.Column(name="QUALITY" if mission == "TESS" else "SAP_QUALITY", format="J", array=quality),
+    ], name="LIGHTCURVE")
+    fits.HDUList([primary, table]).writeto(path, overwrite=True)
+    return path
+
+
+# Curvas sintéticas del benchmark: un sector TESS y una curva Kepler completa
+BENCHMARK_CASES: Dict[str, Dict[str, Any]] = {
+    "tess": {"mission": "TESS", "baseline": 27.0, "cadence_minutes": 2.0},
+    "kepler": {"mission": "Kepler", "baseline": 1400.0, "cadence_minutes": 29.4},
+}
+
+
+def benchmark(n_targets: int = 64, workers: Optional[int] = None, seed: int = 42,
+              case: str = "tess") -> Dict[str, float]:
+    """Mide objetivos/segundo sobre curvas sintéticas y la fracción de periodos recuperados."""
+    rng = np.random.default_rng(seed)
+    periods = rng.uniform(1.0, 10.0, n_targets)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [
+            write_synthetic_lightcurve(os.path.join(tmp, f"synthetic_{i:05d}.fits"), period=periods[i],
+                                       depth=rng.uniform(2e-3, 1e-2), duration_hours=rng.uniform(1.5, 5.0),
+                                       t0=rng.uniform(0.0, periods[i]), target_id=i,
+                                       ra=rng.uniform(0, 360), dec=rng.uniform(-90, 90), seed=seed + i,
+                                       **BENCHMARK_CASES[case])
+            for i in range(n_targets)
+        ]
+        start = _time.perf_counter()
+        features = extract_features(paths, workers=workers)
+        elapsed = _time.perf_counter() - start
+
+    found = features["bls_period"].values
+    truth = periods[features["target_id"].values.astype(int)]
+    # Se acepta el periodo real o alias de 1/2 y 2 veces
+    ratio = found / truth
+    recovered = np.any([np.abs(ratio - k) < 0.01 * k for k in (0.5, 1.0, 2.0)], axis=0)
+    return {
+        "case": case,
+        "targets": n_targets,
+        "seconds": elapsed,
+        "targets_per_second": n_targets / elapsed,
+        "recovered_fraction": float(recovered.mean()) if recovered.size else 0.0,
+    }
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Extraer características BLS de curvas de luz FITS locales.")
+    p.add_argument("directory", nargs="?", help="Carpeta con archivos .fits (búsqueda recursiva)")
+    p.add_argument("--output", default=DEFAULT_OUTPUT, help="Parquet de salida con una fila por objetivo")
+    p.add_argument("--workers", type=int, default=None, help="Procesos del pool (por defecto, núcleos disponibles)")
+    p.add_argument("--join", action="store_true", help="Solo reportar cuántas filas del catálogo tienen curva de luz (no guarda la unión)")
+    p.add_argument("--benchmark", type=int, metavar="N", help="Medir rendimiento con N curvas sintéticas")
+    p.add_argument("--benchmark-case", choices=list(BENCHMARK_CASES), default="tess",
+                   help="Curvas del benchmark: sector TESS de 27 días o Kepler completa de 1400 días")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.benchmark:
+        result = benchmark(args.benchmark, workers=args.workers, case=args.benchmark_case)
+        print(f"[{result['case']}] {result['targets']} objetivos en {result['seconds']:.2f} s "
+              f"-> {result['targets_per_second']:.1f} objetivos/s "
+              f"(periodo recuperado: {result['recovered_fraction']:.0%})")
+        return
+
+    if not args.directory:
+        raise SystemExit("Indica una carpeta con curvas de luz o usa --benchmark N")
+
+    paths = find_lightcurves(args.directory)
+    print(f"Procesando {len(paths)} curvas de luz...")
+    features = extract_features(paths, workers=args.workers)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    features.to_parquet(args.output, index=False, compression="zstd")
+    print(f"Características guardadas en {args.output} ({len(features)} objetivos)")
+
+    if args.join:
+        from dataset_store import load_dataset
+
+        joined = join_features(load_dataset(), features)
+        matched = int(joined["bls_period"].notna().sum())
+        print(f"Filas del catálogo con características de curva de luz: {matched}/{len(joined)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,9 @@ python src/preprocessing/rf_predict.py \
   --pl_eqt 500 --st_teff 5500 --st_logg 4.4 --st_rad 1.0 --st_tmag 12.3 --mission TESS
 
 El script intentará cargar un modelo cacheado 'rf_model.joblib' en la misma carpeta
-del script. Si no existe, entrenará un RandomForest usando
-`../../data/processed/cleaned_datasets.csv` (ruta relativa al archivo).
+del script. Si no existe, entrenará un RandomForest usando el dataset canónico
+`../../data/processed/exoplanets.parquet` (ruta relativa al archivo), leído con
+`dataset_store.load_dataset`.
 
 Devuelve la predicción como texto (la etiqueta original de `disposition_norm`).
 """
@@ -27,10 +28,11 @@ import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
 
+from dataset_store import DEFAULT_STORE, load_dataset
+
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 MODEL_FILE = os.path.join(HERE, "rf_model.joblib")
-DEFAULT_CLEANED_CSV = os.path.join(HERE, "..", "..", "data", "processed", "cleaned_datasets.csv")
 
 FEATURES = [
     "ra",
@@ -47,33 +49,32 @@ FEATURES = [
 ]
 
 
-def train_and_save_model(cleaned_csv_path: str, model_path: str) -> Dict[str, Any]:
-    """Entrena un RandomForest sobre el CSV limpio y guarda el modelo + encoders.
+def encoder_from_categorical(series: pd.Series) -> LabelEncoder:
+    """Construye un LabelEncoder ya ajustado a partir del diccionario de una columna `category`."""
+    le = LabelEncoder()
+    le.classes_ = np.asarray(series.cat.categories.astype(str), dtype=object)
+    return le
 
-    Retorna un dict con claves: model, encoders, le_y, features
-    """
-    if not os.path.exists(cleaned_csv_path):
-        raise FileNotFoundError(f"CSV de entrada no encontrado: {cleaned_csv_path}")
 
-    df = pd.read_csv(cleaned_csv_path)
+def train_and_save_model(store_path: str, model_path: str) -> Dict[str, Any]:
+    """Entrena un RandomForest sobre el dataset canónico y guarda el modelo + encoders.
 
-    missing = [c for c in FEATURES if c not in df.columns]
-    if missing:
-        raise ValueError(f"Faltan columnas esperadas en el CSV: {missing}")
+    Retorna un dict con claves: model, encoders, le_y, features
+    """
+    df = load_dataset(store_path, columns=FEATURES + ["disposition_norm"])
 
     X = df[FEATURES].copy()
-    y = df["disposition_norm"].copy()
+    y = df["disposition_norm"]
 
     encoders: Dict[str, LabelEncoder] = {}
-    # Encodificar columnas categóricas presentes en X (como 'mission')
-    for col in X.select_dtypes(include=[object]).columns:
-        le = LabelEncoder()
-        X[col] = le.fit_transform(X[col].astype(str))
-        encoders[col] = le
+    # Las columnas categóricas (como 'mission') ya vienen codificadas por diccionario
+    for col in X.select_dtypes(include=["category"]).columns:
+        encoders[col] = encoder_from_categorical(X[col])
+        X[col] = X[col].cat.codes
 
-    # Y también puede ser texto; lo codificamos para el modelo
-    le_y = LabelEncoder()
-    y_enc = le_y.fit_transform(y.astype(str))
+    # Y también es categórica; usamos directamente sus códigos
+    le_y = encoder_from_categorical(y)
+    y_enc = y.cat.codes.values
 
     clf = RandomForestClassifier(n_estimators=200, random_state=42)
     clf.fit(X.values, y_enc)
@@ -83,7 +84,7 @@ def train_and_save_model(cleaned_csv_path: str, model_path: str) -> Dict[str, An
     return payload
 
 
-def load_or_train(model_path: str = MODEL_FILE, cleaned_csv: str = DEFAULT_CLEANED_CSV) -> Dict[str, Any]:
+def load_or_train(model_path: str = MODEL_FILE, store_path: str = DEFAULT_STORE) -> Dict[str, Any]:
     if os.path.exists(model_path):
         try:
             payload = joblib.load(model_path)
@@ -95,7 +96,7 @@ def load_or_train(model_path: str = MODEL_FILE, cleaned_csv: str = DEFAULT_CLEAN
             print("Advertencia: no se pudo cargar el modelo cacheado, reentrenando...")
 
     print("Entrenando RandomForest (esto puede tardar unos segundos)...")
-    return train_and_save_model(cleaned_csv, model_path)
+    return train_and_save_model(store_path, model_path)
 
 
 def parse_args(argv=None):
@@ -149,7 +150,7 @@ def main(argv=None):
         except Exception:
             pass
 
-    payload = load_or_train(MODEL_FILE, DEFAULT_CLEANED_CSV)
+    payload = load_or_train(MODEL_FILE, DEFAULT_STORE)
     model: RandomForestClassifier = payload["model"]
     encoders: Dict[str, LabelEncoder] = payload["encoders"]
     le_y: LabelEncoder = payload["le_y"]
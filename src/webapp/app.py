@@ -1,5 +1,6 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestedRangeNotSatisfiable, RequestEntityTooLarge
 import mysql.connector
 from mysql.connector import Error
 import os
@@ -8,9 +9,22 @@ import logging
 import uuid
 import zipfile
 import io
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from collections import deque, Counter
+import csv
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 from openpyxl import load_workbook
 
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -30,9 +44,32 @@ DB_CONFIG = {
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'pdf', 'txt', 'csv', 'json', 'xlsx'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_FILES_PER_REQUEST = int(os.environ.get('MAX_FILES_PER_REQUEST', 20))
+
+# Control de admisión de subidas (configurable por variables de entorno)
+MAX_UPLOADS_EN_CURSO = int(os.environ.get('MAX_UPLOADS_EN_CURSO', 4))
+MAX_UPLOADS_EN_COLA = int(os.environ.get('MAX_UPLOADS_EN_COLA', 16))
+MAX_BYTES_EN_CURSO = int(os.environ.get('MAX_BYTES_EN_CURSO', 100 * 1024 * 1024))  # 100MB
+MAX_EXCEL_EN_CURSO = int(os.environ.get('MAX_EXCEL_EN_CURSO', 2))
+UPLOAD_ESPERA_MAX = float(os.environ.get('UPLOAD_ESPERA_MAX', 10))  # segundos en cola antes de 429
+EXCEL_ESPERA_MAX = float(os.environ.get('EXCEL_ESPERA_MAX', 10))  # nunca más que UPLOAD_ESPERA_MAX
+UPLOAD_RETRY_AFTER = int(os.environ.get('UPLOAD_RETRY_AFTER', 5))  # segundos
+
+# Archivo ZIP de exportación (se mantiene incrementalmente, ver actualizar_archivo_exportacion)
+EXPORT_FOLDER = os.path.join(UPLOAD_FOLDER, 'export')
+EXPORT_ARCHIVE = os.path.join(EXPORT_FOLDER, 'documentos_exoplanetas.zip')
+EXPORT_LOCK = EXPORT_ARCHIVE + '.lock'
+EXPORT_RETRY_AFTER = int(os.environ.get('EXPORT_RETRY_AFTER', 10))  # segundos
+EXPORT_ESPERA_LECTURA = float(os.environ.get('EXPORT_ESPERA_LECTURA', 5))  # espera máxima de una descarga
+EXPORT_DESPERDICIO_MAX = 0.25  # fracción del ZIP en directorios centrales viejos antes de reconstruir
+EXPORT_REINTENTO_MAX = 300  # segundos entre reintentos de una actualización fallida
 
-# Crear carpeta de uploads si no existe
+# Flask rechaza con 413 cuerpos mayores (margen para los campos del formulario)
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILES_PER_REQUEST * MAX_FILE_SIZE + 1024 * 1024
+
+# Crear carpetas de uploads y exportación si no existen
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(EXPORT_FOLDER, exist_ok=True)
 
 def get_db_connection():
     """Crear conexión a la base de datos"""
@@ -43,6 +80,168 @@ def get_db_connection():
         logger.error(f"Error conectando a MySQL: {e}")
         return None
 
+@contextmanager
+def bloqueo_exportacion(timeout=None):
+    """Lock exclusivo sobre EXPORT_LOCK, válido entre hilos y entre procesos.
+
+    El escritor lo mantiene mientras agrega entradas al ZIP; una descarga solo
+    mientras abre el archivo y lee su tamaño, nunca durante la transferencia.
+    Lanza TimeoutError si no se obtiene en `timeout` segundos.
+    """
+    fd = os.open(EXPORT_LOCK, os.O_RDWR | os.O_CREAT)
+    try:
+        inicio = time.monotonic()
+        while True:
+            try:
+                if os.name == 'nt':
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                else:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError:
+                if timeout is not None and time.monotonic() - inicio >= timeout:
+                    raise TimeoutError('ZIP de exportación ocupado')
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+class VistaArchivo(io.FileIO):
+    """Archivo abierto para lectura que termina en `tamano` bytes aunque después crezca"""
+
+    def __init__(self, path, tamano):
+        super().__init__(path, 'rb')
+        self.tamano = tamano
+
+    def read(self, size=-1):
+        restante = max(0, self.tamano - self.tell())
+        if size is None or size < 0 or size > restante:
+            size = restante
+        return super().read(size)
+
+    def readall(self):
+        return self.read()
+
+    def readinto(self, buffer):
+        datos = self.read(len(buffer))
+        buffer[:len(datos)] = datos
+        return len(datos)
+
+# Un solo hilo: las actualizaciones del ZIP se aplican en orden y nunca en paralelo
+export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='export-zip')
+
+class ControlAdmision:
+    """Limita trabajos concurrentes (y opcionalmente bytes en curso) con una cola FIFO acotada.
+
+    `adquirir` espera su turno hasta `timeout` segundos; si la cola está llena
+    o se agota la espera retorna False para que el endpoint responda 429.
+    También lleva las métricas que expone /api/metricas.
+    """
+
+    def __init__(self, nombre, max_en_curso, max_bytes=None, max_en_cola=None):
+        self.nombre = nombre
+        self.max_en_curso = max_en_curso
+        self.max_bytes = max_bytes
+        self.max_en_cola = max_en_cola
+        self._cond = threading.Condition()
+        self._cola = deque()
+        self.en_curso = 0
+        self.bytes_en_curso = 0
+        self.admitidas = 0
+        self.rechazadas = 0
+        self.max_cola_observada = 0
+        self._esperas = deque(maxlen=1000)  # segundos, últimas admisiones
+
+    def _hay_capacidad(self, n_bytes):
+        if self.en_curso >= self.max_en_curso:
+            return False
+        if self.max_bytes is None or self.en_curso == 0:
+            # Un trabajo más grande que el presupuesto entra solo si no hay otros
+            return True
+        return self.bytes_en_curso + n_bytes <= self.max_bytes
+
+    def adquirir(self, n_bytes=0, timeout=None):
+        inicio = time.monotonic()
+        with self._cond:
+            if self.max_en_cola is not None and len(self._cola) >= self.max_en_cola:
+                self.rechazadas += 1
+                return False
+
+            turno = object()
+            self._cola.append(turno)
+            self.max_cola_observada = max(self.max_cola_observada, len(self._cola))
+            try:
+                while not (self._cola[0] is turno and self._hay_capacidad(n_bytes)):
+                    restante = None if timeout is None else timeout - (time.monotonic() - inicio)
+                    if restante is not None and restante <= 0:
+                        self.rechazadas += 1
+                        return False
+                    self._cond.wait(restante)
+
+                self.en_curso += 1
+                self.bytes_en_curso += n_bytes
+                self.admitidas += 1
+                self._esperas.append(time.monotonic() - inicio)
+                return True
+            finally:
+                self._cola.remove(turno)
+                self._cond.notify_all()
+
+    def liberar(self, n_bytes=0):
+        with self._cond:
+            self.en_curso -= 1
+            self.bytes_en_curso -= n_bytes
+            self._cond.notify_all()
+
+    def metricas(self):
+        with self._cond:
+            esperas = sorted(self._esperas)
+            datos = {
+                'en_curso': self.en_curso,
+                'max_en_curso': self.max_en_curso,
+                'en_cola': len(self._cola),
+                'max_en_cola': self.max_en_cola,
+                'max_cola_observada': self.max_cola_observada,
+                'admitidas': self.admitidas,
+                'rechazadas': self.rechazadas,
+            }
+            if self.max_bytes is not None:
+                datos['bytes_en_curso'] = self.bytes_en_curso
+                datos['max_bytes'] = self.max_bytes
+
+        def percentil(p):
+            return round(esperas[min(len(esperas) - 1, int(p * len(esperas)))], 4) if esperas else 0.0
+
+        datos['espera_segundos'] = {
+            'p50': percentil(0.50),
+            'p95': percentil(0.95),
+            'p99': percentil(0.99),
+            'max': round(esperas[-1], 4) if esperas else 0.0,
+            'muestras': len(esperas),
+        }
+        return datos
+
+admision_uploads = ControlAdmision('uploads', MAX_UPLOADS_EN_CURSO,
+                                   max_bytes=MAX_BYTES_EN_CURSO, max_en_cola=MAX_UPLOADS_EN_COLA)
+admision_excel = ControlAdmision('excel', MAX_EXCEL_EN_CURSO)
+
+def respuesta_ocupado():
+    """Respuesta 429 con Retry-After cuando se supera el presupuesto de subidas"""
+    response = jsonify({
+        'error': 'El servidor está procesando muchas subidas, intente de nuevo más tarde',
+        'reintentar_en': UPLOAD_RETRY_AFTER
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(UPLOAD_RETRY_AFTER)
+    return response
+
 def allowed_file(filename):
     """Verificar si la extensión del archivo es permitida"""
     return '.' in filename and \
@@ -182,9 +381,216 @@ def extraer_metadatos_excel(file_path):
         logger.error(f"Error extrayendo metadatos Excel: {e}")
         return {}
 
+def documentos_en_archivo(zip_file):
+    """IDs de documento ya incluidos (guardados en el comentario de cada entrada)"""
+    ids = set()
+    for info in zip_file.infolist():
+        try:
+            ids.add(int(info.comment.decode('ascii')))
+        except ValueError:
+            continue
+    return ids
+
+def agregar_documentos(zip_file, documentos, nombres):
+    """Comprimir `documentos` en el ZIP abierto; el id de cada uno va en el comentario de su entrada"""
+    for documento in documentos:
+        nombre = documento['nombre_archivo']
+        if nombre in nombres:
+            nombre = f"{documento['id']}_{nombre}"
+        nombres.add(nombre)
+
+        info = zipfile.ZipInfo.from_file(documento['ruta_archivo'], nombre)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.comment = str(documento['id']).encode('ascii')
+        with open(documento['ruta_archivo'], 'rb') as origen, zip_file.open(info, 'w') as destino:
+            shutil.copyfileobj(origen, destino, 1024 * 1024)
+
+def actualizar_archivo_exportacion():
+    """Agregar al ZIP de exportación los documentos que aún no contiene.
+
+    El corpus solo crece, así que las entradas nuevas se agregan en el mismo
+    archivo, después de su final actual, seguidas de un directorio central
+    nuevo: lo ya comprimido no se vuelve a leer ni a escribir. Los bytes
+    existentes nunca cambian, así que una descarga que leyó el tamaño antes
+    (ver VistaArchivo) sigue sirviendo un ZIP válido. El directorio central
+    anterior queda como bytes sin uso; cuando superan EXPORT_DESPERDICIO_MAX
+    del archivo, o si el ZIP falta o está dañado, se reconstruye completo en
+    un temporal (mkstemp) que reemplaza al ZIP con `os.replace`.
+    """
+    connection = get_db_connection()
+    if not connection:
+        raise RuntimeError("sin conexión a la base de datos")
+
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT id, nombre_archivo, ruta_archivo FROM documentos_exoplanetas ORDER BY id")
+        documentos = [d for d in cursor.fetchall() if os.path.exists(d['ruta_archivo'])]
+        cursor.close()
+    finally:
+        connection.close()
+
+    # Serializa escritores de todos los procesos (recargador de Flask, varios workers)
+    with bloqueo_exportacion():
+        incluidos = set()
+        nombres = set()
+        reconstruir = True
+        if os.path.exists(EXPORT_ARCHIVE):
+            try:
+                with zipfile.ZipFile(EXPORT_ARCHIVE, 'r') as zip_file:
+                    incluidos = documentos_en_archivo(zip_file)
+                    nombres = set(zip_file.namelist())
+                    # Bytes antes del directorio central que no son entradas: directorios viejos
+                    en_uso = sum(30 + len(i.filename.encode('utf-8')) + len(i.extra) + i.compress_size
+                                 for i in zip_file.infolist())
+                    desperdicio = zip_file.start_dir - en_uso
+                reconstruir = desperdicio > EXPORT_DESPERDICIO_MAX * os.path.getsize(EXPORT_ARCHIVE)
+            except zipfile.BadZipFile:
+                logger.warning("ZIP de exportación dañado, reconstruyendo")
+
+        if reconstruir:
+            if not documentos:
+                return 0
+            fd, temporal = tempfile.mkstemp(dir=EXPORT_FOLDER, suffix='.zip')
+            try:
+                with os.fdopen(fd, 'wb') as archivo, zipfile.ZipFile(archivo, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+                    agregar_documentos(zip_file, documentos, set())
+                # En Windows falla mientras haya una descarga abierta: tarea() lo reintenta
+                os.replace(temporal, EXPORT_ARCHIVE)
+            except Exception:
+                if os.path.exists(temporal):
+                    os.remove(temporal)
+                raise
+            logger.info(f"ZIP de exportación reconstruido: {len(documentos)} documentos")
+            return len(documentos)
+
+        pendientes = [d for d in documentos if d['id'] not in incluidos]
+        if not pendientes:
+            return 0
+
+        with open(EXPORT_ARCHIVE, 'r+b') as archivo:
+            fin = archivo.seek(0, os.SEEK_END)
+            with zipfile.ZipFile(archivo, 'a', zipfile.ZIP_DEFLATED) as zip_file:
+                # Escribir después del final actual y no sobre el directorio central
+                # (el modo 'a' escribe desde start_dir), que las descargas en curso aún leen
+                zip_file.start_dir = fin
+                agregar_documentos(zip_file, pendientes, nombres)
+
+        logger.info(f"ZIP de exportación actualizado: {len(pendientes)} documentos nuevos")
+        return len(pendientes)
+
+# Estado de las actualizaciones del ZIP (protegido por estado_exportacion_lock)
+estado_exportacion_lock = threading.Lock()
+estado_exportacion = {
+    'en_cola': False,     # hay una actualización encolada que aún no empieza
+    'pendientes': 0,      # actualizaciones encoladas o en curso
+    'construido': False,  # ya terminó al menos una actualización completa
+    'fallos': 0,          # fallos seguidos (hay un reintento programado si > 0)
+}
+
+def programar_actualizacion_exportacion():
+    """Encolar la actualización del ZIP sin bloquear la petición actual
+
+    Si ya hay una actualización encolada que no ha empezado no se encola
+    otra: esa verá también los documentos nuevos. Si la actualización falla
+    (sin base de datos, o `os.replace` bloqueado en Windows por una descarga
+    abierta) se reintenta sola con espera exponencial, sin esperar otra subida.
+    """
+    with estado_exportacion_lock:
+        if estado_exportacion['en_cola']:
+            return
+        estado_exportacion['en_cola'] = True
+        estado_exportacion['pendientes'] += 1
+
+    def tarea():
+        with estado_exportacion_lock:
+            estado_exportacion['en_cola'] = False
+        try:
+            actualizar_archivo_exportacion()
+            with estado_exportacion_lock:
+                estado_exportacion['construido'] = True
+                estado_exportacion['fallos'] = 0
+        except Exception as e:
+            with estado_exportacion_lock:
+                estado_exportacion['fallos'] += 1
+                espera = min(EXPORT_RETRY_AFTER * 2 ** (estado_exportacion['fallos'] - 1), EXPORT_REINTENTO_MAX)
+            logger.error(f"Error actualizando ZIP de exportación: {e}; reintento en {espera} s")
+            reintento = threading.Timer(espera, programar_actualizacion_exportacion)
+            reintento.daemon = True
+            reintento.start()
+        finally:
+            with estado_exportacion_lock:
+                estado_exportacion['pendientes'] -= 1
+
+    export_executor.submit(tarea)
+
+def respuesta_exportacion_en_preparacion():
+    """Respuesta 503 con Retry-After mientras el ZIP de exportación se construye"""
+    response = jsonify({
+        'error': 'El archivo ZIP se está preparando, intente de nuevo más tarde',
+        'reintentar_en': EXPORT_RETRY_AFTER
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(EXPORT_RETRY_AFTER)
+    return response
+
+# Columnas de origen por misión en datos_exoplanetas -> valor de `mision` en resumen_mapeos
+COLUMNAS_ORIGEN = {'origen_tess': 'tess', 'origen_kepler': 'kepler', 'origen_k2': 'k2'}
+
+def actualizar_resumen_mapeos(cursor, mapeos):
+    """Sumar los mapeos recién insertados a las tablas de resumen.
+
+    Se ejecuta con el mismo cursor (misma transacción) que los INSERT en
+    datos_exoplanetas, así el resumen nunca queda desfasado. Las claves se
+    ordenan para que subidas concurrentes bloqueen filas en el mismo orden.
+    """
+    if not mapeos:
+        return
+    
+    por_columna = Counter(dato['columna_final'] for dato in mapeos)
+    por_origen = Counter(
+        (dato['columna_final'], mision, dato[campo])
+        for dato in mapeos
+        for campo, mision in COLUMNAS_ORIGEN.items()
+        if dato.get(campo)
+    )
+    
+    cursor.executemany("""
+        INSERT INTO resumen_mapeos_columnas (columna_final, total)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE total = total + VALUES(total)
+    """, sorted(por_columna.items()))
+    
+    if por_origen:
+        cursor.executemany("""
+            INSERT INTO resumen_mapeos (columna_final, mision, columna_origen, total)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE total = total + VALUES(total)
+        """, [(*clave, total) for clave, total in sorted(por_origen.items())])
+
 @app.route('/upload', methods=['POST'])
 def upload_files():
-    """Endpoint para subir archivos y procesar datos de Excel"""
+    """Endpoint para subir archivos y procesar datos de Excel
+
+    Antes de leer el cuerpo se pide turno en `admision_uploads` (subidas y
+    bytes en curso); si no hay capacidad en `UPLOAD_ESPERA_MAX` segundos se
+    responde 429 con Retry-After.
+    """
+    # Content-Length se conoce sin leer el cuerpo; sin él se asume el máximo
+    n_bytes = request.content_length or app.config['MAX_CONTENT_LENGTH']
+    if n_bytes > app.config['MAX_CONTENT_LENGTH']:
+        return jsonify({'error': 'Envío demasiado grande'}), 413
+    
+    if not admision_uploads.adquirir(n_bytes, timeout=UPLOAD_ESPERA_MAX):
+        logger.warning(f"Subida rechazada por control de admisión ({n_bytes} bytes)")
+        return respuesta_ocupado()
+    
+    try:
+        return procesar_subida()
+    finally:
+        admision_uploads.liberar(n_bytes)
+
+def procesar_subida():
+    """Procesar una subida ya admitida"""
     try:
         if 'files' not in request.files:
             return jsonify({'error': 'No se encontraron archivos'}), 400
@@ -197,183 +603,227 @@ def upload_files():
         if not files or files[0].filename == '':
             return jsonify({'error': 'No se seleccionaron archivos'}), 400
         
+        if len(files) > MAX_FILES_PER_REQUEST:
+            return jsonify({'error': f'Máximo {MAX_FILES_PER_REQUEST} archivos por envío'}), 400
+        
         if not consentimiento:
             return jsonify({'error': 'Debe aceptar los términos de uso'}), 400
         
-        connection = get_db_connection()
-        if not connection:
-            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
-        
-        cursor = connection.cursor()
-        archivos_subidos = []
-        archivos_con_error = []
-        datos_procesados = []  # Para almacenar datos extraídos
-        
-        for file in files:
-            # Validar tipo de archivo
-            if not allowed_file(file.filename):
-                archivos_con_error.append({
-                    'nombre': file.filename,
-                    'error': 'Tipo de archivo no permitido'
-                })
-                continue
-            
-            # Validar tamaño
-            file.seek(0, 2)  # Ir al final
-            file_size = file.tell()
-            file.seek(0)  # Volver al inicio
-            
-            if file_size > MAX_FILE_SIZE:
-                archivos_con_error.append({
-                    'nombre': file.filename,
-                    'error': 'Archivo demasiado grande'
-                })
-                continue
-            
-            # Guardar archivo en carpeta
-            file_path, unique_filename = save_file_to_disk(file)
-            if not file_path:
-                archivos_con_error.append({
-                    'nombre': file.filename,
-                    'error': 'Error guardando archivo'
-                })
-                continue
-            
-            # Insertar metadata en la base de datos
-            sql_documento = """
-            INSERT INTO documentos_exoplanetas 
-            (nombre_archivo, tipo_archivo, tamano_archivo, ruta_archivo, donador, descripcion, consentimiento)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            file_extension = file.filename.rsplit('.', 1)[1].lower()
-            
-            cursor.execute(sql_documento, (
-                file.filename,          # Nombre original
-                file_extension,         # Extensión
-                file_size,              # Tamaño
-                file_path,              # Ruta en el servidor
-                donador,                # Donador
-                descripcion,            # Descripción
-                consentimiento          # Consentimiento
-            ))
-            
-            # Obtener el ID del documento recién insertado
-            documento_id = cursor.lastrowid
-            
-            # Procesar datos Excel si es un archivo xlsx
-            datos_extraidos = []
-            if file_extension == 'xlsx':
-                try:
-                    # Procesar el archivo Excel
-                    datos_excel = procesar_excel_plantilla(file_path)
-                    metadatos_excel = extraer_metadatos_excel(file_path)
-                    
-                    # Insertar datos en la tabla datos_exoplanetas
-                    if datos_excel:
-                        sql_datos = """
-                        INSERT INTO datos_exoplanetas 
-                        (documento_id, columna_final, origen_tess, origen_kepler, origen_k2, descripcion)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                        """
-                        
-                        for dato in datos_excel:
-                            cursor.execute(sql_datos, (
-                                documento_id,
-                                dato['columna_final'],
-                                dato.get('origen_tess'),
-                                dato.get('origen_kepler'),
-                                dato.get('origen_k2'),
-                                dato.get('descripcion')
-                            ))
-                        
-                        datos_extraidos = datos_excel
-                    
-                except Exception as e:
-                    logger.error(f"Error procesando Excel {file.filename}: {e}")
-                    # No marcamos como error, solo registramos el problema
-                    datos_extraidos = [{'error': f'Error procesando datos Excel: {str(e)}'}]
-            
-            archivos_subidos.append({
-                'nombre': file.filename,
-                'tipo': file_extension,
-                'tamano': file_size,
-                'ruta': unique_filename,
-                'documento_id': documento_id,
-                'datos_extraidos': len(datos_extraidos) if file_extension == 'xlsx' else 0,
-                'procesado_excel': file_extension == 'xlsx'
-            })
-            
-            # Agregar datos procesados a la respuesta
-            if datos_extraidos:
-                datos_procesados.append({
-                    'documento_id': documento_id,
-                    'nombre_archivo': file.filename,
-                    'total_datos': len(datos_extraidos),
-                    'datos': datos_extraidos
-                })
-        
-        connection.commit()
-        cursor.close()
-        connection.close()
-        
-        response_data = {
-            'message': f'Se subieron {len(archivos_subidos)} archivos correctamente',
-            'archivos': archivos_subidos,
-            'procesados_excel': len([f for f in archivos_subidos if f['procesado_excel']])
-        }
-        
-        if datos_procesados:
-            response_data['datos_procesados'] = datos_procesados
-        
-        if archivos_con_error:
-            response_data['errores'] = archivos_con_error
+        # Limitar cuántos envíos con Excel se procesan a la vez en todo el
+        # servidor; el turno se pide antes de escribir nada en disco o en la BD.
+        # Mientras espera, esta petición ocupa un turno de admision_uploads (y
+        # sus bytes), así que no espera más de lo que esperaría una subida
+        # común: si no, unas cuantas subidas con Excel en espera dejarían sin
+        # capacidad a las demás.
+        con_excel = any(
+            allowed_file(file.filename) and file.filename.rsplit('.', 1)[1].lower() == 'xlsx'
+            for file in files
+        )
+        espera_excel = min(EXCEL_ESPERA_MAX, UPLOAD_ESPERA_MAX)
+        if con_excel and not admision_excel.adquirir(timeout=espera_excel):
+            logger.warning("Subida rechazada: demasiados archivos Excel en proceso")
+            return respuesta_ocupado()
         
-        return jsonify(response_data), 200
+        try:
+            return registrar_subida(files, donador, descripcion, consentimiento)
+        finally:
+            if con_excel:
+                admision_excel.liberar()
         
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'Envío demasiado grande'}), 413
     except Exception as e:
         logger.error(f"Error en upload_files: {e}")
         return jsonify({'error': 'Error interno del servidor'}), 500
         
+def registrar_subida(files, donador, descripcion, consentimiento):
+    """Guardar los archivos, registrarlos en la base de datos y extraer los datos de Excel"""
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+
+    cursor = connection.cursor()
+    archivos_subidos = []
+    archivos_con_error = []
+    datos_procesados = []  # Para almacenar datos extraídos
+    mapeos_insertados = []  # Para actualizar resumen_mapeos antes del commit
+
+    for file in files:
+        # Validar tipo de archivo
+        if not allowed_file(file.filename):
+            archivos_con_error.append({
+                'nombre': file.filename,
+                'error': 'Tipo de archivo no permitido'
+            })
+            continue
+
+        # Validar tamaño
+        file.seek(0, 2)  # Ir al final
+        file_size = file.tell()
+        file.seek(0)  # Volver al inicio
+
+        if file_size > MAX_FILE_SIZE:
+            archivos_con_error.append({
+                'nombre': file.filename,
+                'error': 'Archivo demasiado grande'
+            })
+            continue
+
+        # Guardar archivo en carpeta
+        file_path, unique_filename = save_file_to_disk(file)
+        if not file_path:
+            archivos_con_error.append({
+                'nombre': file.filename,
+                'error': 'Error guardando archivo'
+            })
+            continue
+
+        # Insertar metadata en la base de datos
+        sql_documento = """
+        INSERT INTO documentos_exoplanetas 
+        (nombre_archivo, tipo_archivo, tamano_archivo, ruta_archivo, donador, descripcion, consentimiento)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+
+        file_extension = file.filename.rsplit('.', 1)[1].lower()
+
+        cursor.execute(sql_documento, (
+            file.filename,          # Nombre original
+            file_extension,         # Extensión
+            file_size,              # Tamaño
+            file_path,              # Ruta en el servidor
+            donador,                # Donador
+            descripcion,            # Descripción
+            consentimiento          # Consentimiento
+        ))
+
+        # Obtener el ID del documento recién insertado
+        documento_id = cursor.lastrowid
+
+        # Procesar datos Excel si es un archivo xlsx
+        datos_extraidos = []
+        if file_extension == 'xlsx':
+            try:
+                # Procesar el archivo Excel
+                datos_excel = procesar_excel_plantilla(file_path)
+                metadatos_excel = extraer_metadatos_excel(file_path)
+
+                # Insertar datos en la tabla datos_exoplanetas
+                if datos_excel:
+                    sql_datos = """
+                    INSERT INTO datos_exoplanetas 
+                    (documento_id, columna_final, origen_tess, origen_kepler, origen_k2, descripcion)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    """
+
+                    for dato in datos_excel:
+                        cursor.execute(sql_datos, (
+                            documento_id,
+                            dato['columna_final'],
+                            dato.get('origen_tess'),
+                            dato.get('origen_kepler'),
+                            dato.get('origen_k2'),
+                            dato.get('descripcion')
+                        ))
+                        mapeos_insertados.append(dato)
+
+                    datos_extraidos = datos_excel
+
+            except Exception as e:
+                logger.error(f"Error procesando Excel {file.filename}: {e}")
+                # No marcamos como error, solo registramos el problema
+                datos_extraidos = [{'error': f'Error procesando datos Excel: {str(e)}'}]
+
+        archivos_subidos.append({
+            'nombre': file.filename,
+            'tipo': file_extension,
+            'tamano': file_size,
+            'ruta': unique_filename,
+            'documento_id': documento_id,
+            'datos_extraidos': len(datos_extraidos) if file_extension == 'xlsx' else 0,
+            'procesado_excel': file_extension == 'xlsx'
+        })
+
+        # Agregar datos procesados a la respuesta
+        if datos_extraidos:
+            datos_procesados.append({
+                'documento_id': documento_id,
+                'nombre_archivo': file.filename,
+                'total_datos': len(datos_extraidos),
+                'datos': datos_extraidos
+            })
+
+    actualizar_resumen_mapeos(cursor, mapeos_insertados)
+
+    connection.commit()
+    cursor.close()
+    connection.close()
+
+    if archivos_subidos:
+        programar_actualizacion_exportacion()
+
+    response_data = {
+        'message': f'Se subieron {len(archivos_subidos)} archivos correctamente',
+        'archivos': archivos_subidos,
+        'procesados_excel': len([f for f in archivos_subidos if f['procesado_excel']])
+    }
+
+    if datos_procesados:
+        response_data['datos_procesados'] = datos_procesados
+
+    if archivos_con_error:
+        response_data['errores'] = archivos_con_error
+
+    return jsonify(response_data), 200
+
 @app.route('/api/descargar-todos', methods=['GET'])
 def descargar_todos_documentos():
-    """Endpoint para descargar todos los documentos en un ZIP"""
+    """Endpoint para descargar todos los documentos en un ZIP
+
+    Sirve el ZIP de exportación ya construido (sin comprimir nada en la
+    petición) con soporte de GET condicional (ETag/Last-Modified) y Range
+    para reanudar descargas. Mientras el ZIP no existe responde 503 con
+    Retry-After.
+    """
     try:
-        connection = get_db_connection()
-        if not connection:
-            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
-        
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT id, nombre_archivo, ruta_archivo FROM documentos_exoplanetas")
-        
-        documentos = cursor.fetchall()
-        cursor.close()
-        connection.close()
+        try:
+            # El lock solo cubre abrir el ZIP y leer su tamaño: lo que se agregue
+            # después queda fuera de esta descarga y no la bloquea
+            with bloqueo_exportacion(timeout=EXPORT_ESPERA_LECTURA):
+                stat = os.stat(EXPORT_ARCHIVE)
+                zip_file = VistaArchivo(EXPORT_ARCHIVE, stat.st_size)
+        except TimeoutError:
+            return respuesta_exportacion_en_preparacion()
+        except FileNotFoundError:
+            with estado_exportacion_lock:
+                construido = estado_exportacion['construido']
+                pendientes = estado_exportacion['pendientes'] or estado_exportacion['fallos']
+            if construido and not pendientes:
+                return jsonify({'error': 'No hay documentos disponibles'}), 404
+            # Aún no se construye (o falló al arrancar): encolar y pedir reintento
+            programar_actualizacion_exportacion()
+            return respuesta_exportacion_en_preparacion()
         
-        if not documentos:
-            return jsonify({'error': 'No hay documentos disponibles'}), 404
-        
-        # Crear archivo ZIP en memoria
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for documento in documentos:
-                if os.path.exists(documento['ruta_archivo']):
-                    # Agregar archivo al ZIP
-                    zip_file.write(
-                        documento['ruta_archivo'], 
-                        documento['nombre_archivo']
-                    )
-        
-        zip_buffer.seek(0)
-        
-        # Enviar ZIP
-        return send_file(
-            zip_buffer,
-            as_attachment=True,
-            download_name=f"documentos_exoplanetas_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
-            mimetype='application/zip'
-        )
+        try:
+            response = send_file(
+                zip_file,
+                as_attachment=True,
+                download_name=f"documentos_exoplanetas_{datetime.fromtimestamp(stat.st_mtime).strftime('%Y%m%d_%H%M')}.zip",
+                mimetype='application/zip',
+                conditional=False,
+                etag=False
+            )
+            response.content_length = stat.st_size
+            response.last_modified = stat.st_mtime
+            response.set_etag(f"{stat.st_mtime_ns}-{stat.st_size}")
+            return response.make_conditional(request, accept_ranges=True, complete_length=stat.st_size)
+        except Exception:
+            zip_file.close()
+            raise
         
+    except RequestedRangeNotSatisfiable:
+        # Rango fuera del archivo: responder 416 en lugar de 500
+        raise
     except Exception as e:
         logger.error(f"Error en descargar_todos_documentos: {e}")
         return jsonify({'error': 'Error al crear el archivo ZIP'}), 500
@@ -426,6 +876,131 @@ def total_donadores():
         logger.error(f"Error en total-donadores: {e}")
         return jsonify({'error': 'Error interno del servidor'}), 500
     
+@app.route('/api/mapeos', methods=['GET'])
+def mapeos():
+    """Endpoint con el mapeo de consenso por columna_final (lee solo las tablas de resumen)"""
+    try:
+        connection = get_db_connection()
+        if not connection:
+            return jsonify({'error': 'Error de conexión'}), 500
+        
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT columna_final, total FROM resumen_mapeos_columnas ORDER BY columna_final")
+        columnas = cursor.fetchall()
+        cursor.execute("""
+            SELECT columna_final, mision, columna_origen, total
+            FROM resumen_mapeos
+            ORDER BY columna_final, mision, total DESC, columna_origen
+        """)
+        origenes = cursor.fetchall()
+        
+        cursor.close()
+        connection.close()
+        
+        resultado = {}
+        for fila in columnas:
+            resultado[fila['columna_final']] = {
+                'columna_final': fila['columna_final'],
+                'total': fila['total'],
+                'consenso': {campo: None for campo in COLUMNAS_ORIGEN},
+                **{campo: [] for campo in COLUMNAS_ORIGEN}
+            }
+        
+        campos = {mision: campo for campo, mision in COLUMNAS_ORIGEN.items()}
+        for fila in origenes:
+            mapeo = resultado.get(fila['columna_final'])
+            if mapeo is None:
+                continue
+            campo = campos[fila['mision']]
+            # Las filas vienen ordenadas por total: la primera de cada misión es el consenso
+            if not mapeo[campo]:
+                mapeo['consenso'][campo] = fila['columna_origen']
+            mapeo[campo].append({'columna': fila['columna_origen'], 'total': fila['total']})
+        
+        return jsonify({
+            'success': True,
+            'mapeos': list(resultado.values())
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error en mapeos: {e}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
+@app.route('/api/mapeos/exportar', methods=['GET'])
+def exportar_mapeos():
+    """Endpoint para descargar el resumen de mapeos como CSV (streaming)
+
+    Las filas se leen con un cursor sin buffer del lado del servidor y se
+    escriben a la respuesta a medida que llegan, sin cargar todo en memoria.
+    """
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Error de conexión'}), 500
+    
+    recursos = {'cursor': None, 'cerrado': False}
+    
+    def cerrar():
+        """Cerrar cursor y conexión una sola vez (al terminar el streaming o al cerrar la respuesta)"""
+        if recursos['cerrado']:
+            return
+        recursos['cerrado'] = True
+        try:
+            if recursos['cursor'] is not None:
+                recursos['cursor'].close()
+        except Error:
+            # Cliente desconectado a mitad del streaming: quedan filas sin leer
+            pass
+        finally:
+            connection.close()
+    
+    def generar():
+        cursor = recursos['cursor'] = connection.cursor(buffered=False)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        try:
+            cursor.execute("""
+                SELECT m.columna_final, m.mision, m.columna_origen, m.total, c.total
+                FROM resumen_mapeos m
+                JOIN resumen_mapeos_columnas c ON c.columna_final = m.columna_final
+                ORDER BY m.columna_final, m.mision, m.total DESC, m.columna_origen
+            """)
+            writer.writerow(['columna_final', 'mision', 'columna_origen', 'total', 'total_columna_final'])
+            while True:
+                filas = cursor.fetchmany(500)
+                if not filas:
+                    break
+                writer.writerows(filas)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+            yield buffer.getvalue()
+        except Exception as e:
+            # Propagar: el servidor corta la respuesta chunked en lugar de
+            # terminarla bien, y el cliente no toma un CSV truncado por completo
+            logger.error(f"Error en exportar_mapeos: {e}")
+            raise
+        finally:
+            cerrar()
+    
+    response = Response(
+        stream_with_context(generar()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f"attachment; filename=mapeos_exoplanetas_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"}
+    )
+    # Si el generador nunca arranca (HEAD, cliente que se va antes del primer
+    # bloque) su `finally` no corre; el servidor igual cierra la respuesta
+    response.call_on_close(cerrar)
+    return response
+
+@app.route('/api/metricas', methods=['GET'])
+def metricas():
+    """Endpoint con el estado del control de admisión (colas, esperas y rechazos)"""
+    return jsonify({
+        'success': True,
+        'uploads': admision_uploads.metricas(),
+        'excel': admision_excel.metricas()
+    }), 200
+
 @app.route('/api/descargar-plantilla', methods=['GET'])
 def descargar_plantilla():
     """Endpoint para descargar la plantilla Excel"""
@@ -453,4 +1028,8 @@ def descargar_plantilla():
         return jsonify({'error': 'Error al descargar la plantilla'}), 500
 
 if __name__ == '__main__':
+    # Construir (o completar) el ZIP al arrancar, no en la primera descarga. Con
+    # debug=True solo en el proceso hijo del recargador, que es el que sirve
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        programar_actualizacion_exportacion()
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""load_test.py
+
+Prueba de carga local: una ráfaga de subidas concurrentes a `/upload`
+mientras se mide la latencia de un endpoint de lectura.
+
+Uso (con la app corriendo en otra terminal: python app.py):
+python src/webapp/load_test.py --uploads 50 --concurrencia 25 --tamano-mb 5
+
+Reporta cuántas subidas fueron aceptadas (200) o rechazadas (429), los
+percentiles de latencia de `/api/total-archivos` durante la ráfaga y las
+métricas de `/api/metricas` al final. Solo usa la librería estándar.
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+def cuerpo_multipart(n_bytes):
+    """Construir un multipart/form-data con un archivo .txt de `n_bytes`"""
+    limite = uuid.uuid4().hex
+    partes = []
+    for nombre, valor in (('donador', 'prueba-carga'), ('description', 'load test'), ('consent', 'true')):
+        partes.append(
+            f'--{limite}\r\nContent-Disposition: form-data; name="{nombre}"\r\n\r\n{valor}\r\n'.encode()
+        )
+    partes.append(
+        f'--{limite}\r\nContent-Disposition: form-data; name="files"; filename="carga.txt"\r\n'
+        f'Content-Type: text/plain\r\n\r\n'.encode()
+    )
+    partes.append(b'x' * n_bytes)
+    partes.append(f'\r\n--{limite}--\r\n'.encode())
+    return b''.join(partes), f'multipart/form-data; boundary={limite}'
+
+
+def subir(url, cuerpo, content_type):
+    req = urllib.request.Request(f'{url}/upload', data=cuerpo, method='POST',
+                                 headers={'Content-Type': content_type})
+    try:
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except Exception:
+        return 'error'
+
+
+def medir_lecturas(url, detener, latencias):
+    while not detener.is_set():
+        inicio = time.perf_counter()
+        try:
+            with urllib.request.urlopen(f'{url}/api/total-archivos', timeout=30) as resp:
+                resp.read()
+        except Exception:
+            pass
+        latencias.append(time.perf_counter() - inicio)
+        time.sleep(0.05)
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description='Prueba de carga de subidas concurrentes.')
+    p.add_argument('--url', default='http://localhost:5000')
+    p.add_argument('--uploads', type=int, default=50, help='Total de subidas a enviar')
+    p.add_argument('--concurrencia', type=int, default=25, help='Subidas simultáneas')
+    p.add_argument('--tamano-mb', type=float, default=5.0, help='Tamaño de cada archivo')
+    p.add_argument('--lectores', type=int, default=4, help='Hilos midiendo la latencia de lectura')
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cuerpo, content_type = cuerpo_multipart(int(args.tamano_mb * 1024 * 1024))
+
+    # Línea base de lectura sin carga
+    base = []
+    detener = threading.Event()
+    hilo = threading.Thread(target=medir_lecturas, args=(args.url, detener, base))
+    hilo.start()
+    time.sleep(2)
+    detener.set()
+    hilo.join()
+
+    latencias = []
+    detener = threading.Event()
+    lectores = [threading.Thread(target=medir_lecturas, args=(args.url, detener, latencias))
+                for _ in range(args.lectores)]
+    for t in lectores:
+        t.start()
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrencia) as pool:
+        estados = Counter(pool.map(lambda _: subir(args.url, cuerpo, content_type), range(args.uploads)))
+    duracion = time.perf_counter() - inicio
+
+    detener.set()
+    for t in lectores:
+        t.join()
+
+    print(f'Subidas: {args.uploads} en {duracion:.1f} s -> {dict(estados)}')
+    for nombre, valores in (('sin carga', base), ('durante la ráfaga', latencias)):
+        print(f'Lectura /api/total-archivos {nombre}: '
+              f'p50={percentil(valores, 0.5) * 1000:.0f} ms '
+              f'p99={percentil(valores, 0.99) * 1000:.0f} ms '
+              f'max={max(valores, default=0) * 1000:.0f} ms ({len(valores)} muestras)')
+
+    with urllib.request.urlopen(f'{args.url}/api/metricas', timeout=30) as resp:
+        print(json.dumps(json.load(resp), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
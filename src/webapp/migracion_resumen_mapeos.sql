@@ -0,0 +1,60 @@
+-- Migración: tablas de resumen de mapeos de columnas
+--
+-- Crea `resumen_mapeos_columnas` y `resumen_mapeos` (las mantiene
+-- upload_files) y las llena a partir de `datos_exoplanetas`. Se aplica sobre
+-- una base `nasa` ya creada con nasa.sql, exista o no información donada:
+--
+--   mysql -u root nasa < src/webapp/migracion_resumen_mapeos.sql
+--
+-- Se puede volver a ejecutar: las tablas se crean solo si no existen y los
+-- totales se recalculan desde `datos_exoplanetas`.
+
+SET NAMES utf8mb4;
+START TRANSACTION;
+
+--
+-- Estructura de tabla para la tabla `resumen_mapeos_columnas`
+-- (resumen de datos_exoplanetas: filas donadas por columna_final)
+--
+
+CREATE TABLE IF NOT EXISTS `resumen_mapeos_columnas` (
+  `columna_final` varchar(100) NOT NULL,
+  `total` int(11) NOT NULL DEFAULT 0,
+  `actualizado` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+  PRIMARY KEY (`columna_final`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+--
+-- Estructura de tabla para la tabla `resumen_mapeos`
+-- (resumen de datos_exoplanetas: votos por columna de origen y misión)
+--
+
+CREATE TABLE IF NOT EXISTS `resumen_mapeos` (
+  `columna_final` varchar(100) NOT NULL,
+  `mision` varchar(10) NOT NULL,
+  `columna_origen` varchar(255) NOT NULL,
+  `total` int(11) NOT NULL DEFAULT 0,
+  `actualizado` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+  PRIMARY KEY (`columna_final`,`mision`,`columna_origen`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+--
+-- Carga de las tablas de resumen a partir de datos_exoplanetas
+--
+
+INSERT INTO `resumen_mapeos_columnas` (`columna_final`, `total`)
+SELECT `columna_final`, COUNT(*) FROM `datos_exoplanetas` GROUP BY `columna_final`
+ON DUPLICATE KEY UPDATE `total` = VALUES(`total`);
+
+INSERT INTO `resumen_mapeos` (`columna_final`, `mision`, `columna_origen`, `total`)
+SELECT `columna_final`, `mision`, `columna_origen`, COUNT(*) FROM (
+  SELECT `columna_final`, 'tess' AS `mision`, `origen_tess` AS `columna_origen` FROM `datos_exoplanetas` WHERE `origen_tess` IS NOT NULL
+  UNION ALL
+  SELECT `columna_final`, 'kepler', `origen_kepler` FROM `datos_exoplanetas` WHERE `origen_kepler` IS NOT NULL
+  UNION ALL
+  SELECT `columna_final`, 'k2', `origen_k2` FROM `datos_exoplanetas` WHERE `origen_k2` IS NOT NULL
+) AS `origenes`
+GROUP BY `columna_final`, `mision`, `columna_origen`
+ON DUPLICATE KEY UPDATE `total` = VALUES(`total`);
+
+COMMIT;
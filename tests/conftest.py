@@ -0,0 +1,6 @@
+"""Configuración de pytest: los scripts de src/preprocessing se importan como módulos sueltos."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "preprocessing"))
@@ -0,0 +1,178 @@
+"""Pruebas de cleaning.py con DataFrames pequeños por misión."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cleaning
+from cleaning import MISSIONS, clean_mission, model_rows, run_cleaning
+
+
+def base_frame(mission, n=6):
+    """Columnas protegidas de la misión con valores distintos por fila (sin nulos)."""
+    spec = MISSIONS[mission]
+    df = pd.DataFrame({col: np.arange(n, dtype=float) + i for i, col in enumerate(spec["protect"])})
+    df[spec["target"]] = ["CONFIRMED", "FALSE POSITIVE"] * (n // 2)
+    return df
+
+
+def test_toi_steps():
+    spec = MISSIONS["TOI"]
+    df = base_frame("TOI")
+    df["toi"] = np.arange(6)
+    df["constante"] = 1
+    df["pl_insolerr1"] = 0.1 * np.arange(6)
+    df["st_logg"] = 4.4                       # protegida y constante
+    for i in range(7):                        # fila 0: 7 nulos (> 6)
+        df[f"extra{i}"] = [np.nan] + [float(i)] * 5
+    df.loc[1, [f"extra{i}" for i in range(6)]] = np.nan   # fila 1: 6 nulos
+
+    out = clean_mission(df, spec)
+    assert out["toi"].tolist() == [1, 2, 3, 4, 5]
+    assert "pl_insolerr1" not in out.columns
+    assert "constante" not in out.columns
+    assert "extra0" not in out.columns        # constante tras quitar la fila 0
+    assert "st_logg" in out.columns
+
+
+def test_kepler_steps():
+    spec = MISSIONS["Kepler"]
+    df = base_frame("Kepler")
+    df["kepid"] = np.arange(6)
+    df["constante"] = 1
+    df["koi_teq_err1"] = 1.0
+    df["koi_teq_err2"] = -1.0
+    df["a"] = [np.nan, np.nan, 1, 1, 1, 1]
+    df["b"] = [np.nan, np.nan, 1, 1, 1, 1]
+    df["c"] = [np.nan, np.nan, 1, 1, 1, 1]
+    df["d"] = [np.nan, 1, 1, 1, 1, 1]         # fila 0: 4 nulos, fila 1: 3
+
+    out = clean_mission(df, spec)
+    assert out["kepid"].tolist() == [1, 2, 3, 4, 5]
+    assert "koi_teq_err1" not in out.columns and "koi_teq_err2" not in out.columns
+    assert "constante" in out.columns         # el notebook de Kepler no poda constantes
+
+
+def test_k2_steps():
+    spec = MISSIONS["K2"]
+    df = base_frame("K2")
+    df["pl_name"] = [f"K2-{i}" for i in range(6)]
+    df["mayoria_nula"] = [1.0, np.nan, np.nan, np.nan, np.nan, 2.0]   # 4/6 nulos
+    df["pl_insol"] = [1.0, np.nan, np.nan, np.nan, np.nan, 2.0]       # protegida
+    df["vacia"] = np.nan
+    df["constante"] = "x"
+    df["sy_dist"] = [1.0, 2.0, np.nan, 4.0, 5.0, 6.0]                 # fila 2 cae en dropna
+    df.loc[3, "disposition"] = np.nan                                   # fila 3: target nulo
+
+    out = clean_mission(df, spec)
+    assert out["pl_name"].tolist() == ["K2-0", "K2-1", "K2-4", "K2-5"]
+    for col in ("mayoria_nula", "vacia", "constante"):
+        assert col not in out.columns
+    # Los nulos en columnas protegidas no eliminan filas
+    assert out["pl_insol"].isna().tolist() == [False, True, True, False]
+
+
+@pytest.mark.parametrize("mission", list(MISSIONS))
+def test_protected_columns_survive(mission):
+    spec = MISSIONS[mission]
+    df = base_frame(mission)
+    for col in spec["protect"]:
+        if col != spec["target"]:
+            df[col] = 1.0                     # constantes: candidatas a poda
+    df.loc[:3, spec["protect"][1]] = np.nan   # mayoría nula
+    df["otra"] = np.arange(6)
+
+    out = clean_mission(df, spec)
+    assert set(spec["protect"]) <= set(out.columns)
+
+
+def test_model_rows_ignore_other_columns():
+    spec = MISSIONS["K2"]
+    df = base_frame("K2")
+    df["sy_dist"] = [np.nan, np.nan, 1.0, 2.0, 3.0, 4.0]   # no la usa el modelo
+    df.loc[0, "pl_eqt"] = np.nan
+
+    feed = model_rows(df, spec)
+    assert list(feed.columns) == spec["protect"]
+    assert len(feed) == 5                     # solo cae la fila sin pl_eqt
+    assert len(clean_mission(df, spec)) == 4  # el dropna del notebook mira sy_dist
+
+
+RAW_NAMES = {
+    "TOI": "TESS_TOI_2025.01.01_00.00.00.csv",
+    "Kepler": "Kepler_cumulative_2025.01.01_00.00.00.csv",
+    "K2": "k2pandc_2025.01.01_00.00.00.csv",
+}
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    raw_dir, processed_dir = tmp_path / "raw", tmp_path / "processed"
+    raw_dir.mkdir()
+    for mission, name in RAW_NAMES.items():
+        df = base_frame(mission)
+        df["id"] = np.arange(len(df))
+        df.loc[0, MISSIONS[mission]["protect"][1]] = np.nan
+        df.to_csv(raw_dir / name, index=False)
+    return str(raw_dir), str(processed_dir)
+
+
+def run(dirs, **kwargs):
+    raw_dir, processed_dir = dirs
+    return run_cleaning(raw_dir=raw_dir, processed_dir=processed_dir, max_workers=1, **kwargs)
+
+
+def test_run_cleaning_outputs_and_row_counts(dirs):
+    outputs = run(dirs)
+    feeds = run(dirs, model_feed=True)
+    state = cleaning.load_state(os.path.join(dirs[1], ".cleaning_state.json"))
+    for mission, spec in MISSIONS.items():
+        assert os.path.basename(outputs[mission]) == spec["output"]
+        assert os.path.basename(feeds[mission]) == spec["model_output"]
+        assert len(pd.read_csv(feeds[mission])) == state[mission]["model_rows"] == 5
+        assert len(pd.read_csv(outputs[mission])) == state[mission]["rows"]
+
+
+def test_run_cleaning_skips_unchanged_and_reruns_on_changes(dirs, monkeypatch, capsys):
+    raw_dir, processed_dir = dirs
+    run(dirs)
+    capsys.readouterr()
+
+    run(dirs)
+    assert capsys.readouterr().out.count("sin cambios") == 3
+
+    # Cambia la entrada de K2
+    k2_raw = os.path.join(raw_dir, RAW_NAMES["K2"])
+    pd.read_csv(k2_raw).head(4).to_csv(k2_raw, index=False)
+    run(dirs)
+    out = capsys.readouterr().out
+    assert out.count("sin cambios") == 2 and "✓ K2" in out
+
+    # Cambian los parámetros de Kepler
+    monkeypatch.setitem(MISSIONS, "Kepler", {**MISSIONS["Kepler"], "max_row_nulls": 5})
+    run(dirs)
+    out = capsys.readouterr().out
+    assert out.count("sin cambios") == 2 and "✓ Kepler" in out
+
+
+def test_run_cleaning_saves_state_of_finished_missions(dirs):
+    raw_dir, processed_dir = dirs
+    pd.DataFrame({"sin_target": [1, 2]}).to_csv(os.path.join(raw_dir, RAW_NAMES["K2"]), index=False)
+
+    with pytest.raises(RuntimeError, match="K2"):
+        run(dirs)
+    state = cleaning.load_state(os.path.join(processed_dir, ".cleaning_state.json"))
+    assert set(state) == {"TOI", "Kepler"}
+
+
+def test_row_counts_on_repo_exports(tmp_path):
+    """Con los exports de data/raw: mismas filas que los notebooks y todas las filas entrenables."""
+    if not all(cleaning.latest_raw(spec["raw_pattern"]) for spec in MISSIONS.values()):
+        pytest.skip("faltan exports en data/raw")
+    run_cleaning(processed_dir=str(tmp_path))
+    state = cleaning.load_state(str(tmp_path / ".cleaning_state.json"))
+
+    assert {m: state[m]["rows"] for m in MISSIONS} == {"TOI": 5144, "Kepler": 7822, "K2": 1224}
+    assert {m: state[m]["model_rows"] for m in MISSIONS} == {"TOI": 6628, "Kepler": 9200, "K2": 335}
@@ -0,0 +1,71 @@
+"""Pruebas de dataset_store.py (ida y vuelta por Parquet y codificaciones)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+from dataset_store import (
+    CATEGORICAL_COLUMNS,
+    NUMERIC_COLUMNS,
+    _typed,
+    encode_dataset,
+    encoding_maps,
+    load_dataset,
+    save_dataset,
+)
+from rf_predict import encoder_from_categorical
+
+
+@pytest.fixture
+def dataset():
+    rng = np.random.default_rng(0)
+    n = 8
+    df = pd.DataFrame({col: rng.normal(size=n) for col in NUMERIC_COLUMNS})
+    # Orden de aparición distinto del alfabético, a propósito
+    df["mission"] = ["TESS", "Kepler", "K2", "TESS", "Kepler", "TESS", "K2", "Kepler"]
+    df["disposition_norm"] = ["FALSE", "CONFIRMED", "CANDIDATE", "UNKNOWN",
+                              "CONFIRMED", "FALSE", "CANDIDATE", "CONFIRMED"]
+    return df
+
+
+def test_round_trip(tmp_path, dataset):
+    path = str(tmp_path / "exoplanets.parquet")
+    save_dataset(dataset, path)
+    loaded = load_dataset(path)
+
+    assert list(loaded.columns) == NUMERIC_COLUMNS + CATEGORICAL_COLUMNS
+    for col in NUMERIC_COLUMNS:
+        assert loaded[col].dtype == "float64"
+        np.testing.assert_array_equal(loaded[col].to_numpy(), dataset[col].to_numpy())
+    for col in CATEGORICAL_COLUMNS:
+        assert isinstance(loaded[col].dtype, pd.CategoricalDtype)
+        assert list(loaded[col].cat.categories) == sorted(dataset[col].unique())
+        assert loaded[col].astype(str).tolist() == dataset[col].tolist()
+
+
+def test_encodings_match_label_encoder(tmp_path, dataset):
+    path = str(tmp_path / "exoplanets.parquet")
+    loaded = load_dataset(save_dataset(dataset, path))
+    encoded = encode_dataset(loaded)
+    maps = encoding_maps(loaded)
+
+    for col in CATEGORICAL_COLUMNS:
+        le = LabelEncoder().fit(dataset[col])
+        np.testing.assert_array_equal(encoded[col].to_numpy(), le.transform(dataset[col]))
+        assert maps[col] == {cls: i for i, cls in enumerate(le.classes_)}
+
+        # rf_predict reconstruye el encoder a partir del diccionario
+        rebuilt = encoder_from_categorical(loaded[col])
+        np.testing.assert_array_equal(rebuilt.classes_, le.classes_)
+        assert rebuilt.inverse_transform([0])[0] == le.classes_[0]
+
+
+def test_typed_requires_all_columns(dataset):
+    with pytest.raises(ValueError, match="pl_eqt"):
+        _typed(dataset.drop(columns=["pl_eqt"]))
+
+
+def test_load_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_dataset(str(tmp_path / "no_existe.parquet"))
@@ -0,0 +1,115 @@
+"""Pruebas de lightcurve_features.py con curvas de luz FITS sintéticas.
+
+Ejecutar desde la raíz del repo: python -m pytest tests
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from astropy.io import fits
+
+from lightcurve_features import (
+    FEATURE_COLUMNS,
+    extract_features,
+    extract_one,
+    join_features,
+    period_grid,
+    read_lightcurve,
+    write_synthetic_lightcurve,
+)
+
+
+@pytest.fixture
+def tess_lc(tmp_path):
+    path = tmp_path / "tess.fits"
+    write_synthetic_lightcurve(str(path), period=3.3, depth=5e-3, duration_hours=3.0,
+                               target_id=123, ra=10.0, dec=-20.0, seed=1)
+    return str(path)
+
+
+def test_read_lightcurve_metadata(tess_lc):
+    lc = read_lightcurve(tess_lc)
+    assert lc["mission"] == "TESS"
+    assert lc["target_id"] == 123
+    assert (lc["ra"], lc["dec"]) == (10.0, -20.0)
+    assert lc["time"].size == lc["flux"].size > 0
+
+
+def test_read_lightcurve_filters_quality_and_nan(tess_lc):
+    total = read_lightcurve(tess_lc)["time"].size
+    with fits.open(tess_lc, mode="update") as hdul:
+        data = hdul[1].data
+        data["QUALITY"][:10] = 1
+        data["PDCSAP_FLUX"][10:15] = np.nan
+        data["TIME"][15:17] = np.nan
+
+    lc = read_lightcurve(tess_lc)
+    assert lc["time"].size == total - 17
+    assert np.isfinite(lc["time"]).all() and np.isfinite(lc["flux"]).all()
+
+
+def test_bls_recovers_period(tess_lc):
+    row = extract_one(tess_lc)
+    assert row["bls_period"] == pytest.approx(3.3, rel=0.01)
+    assert row["bls_depth"] == pytest.approx(5e-3, rel=0.3)
+    assert row["bls_snr"] > 10
+
+
+def test_kepler_sap_quality_column(tmp_path):
+    path = tmp_path / "kepler.fits"
+    write_synthetic_lightcurve(str(path), period=2.5, depth=5e-3, duration_hours=3.0, baseline=40.0,
+                               cadence_minutes=29.4, mission="Kepler", target_id=7, seed=2)
+    features = extract_features([str(path)], workers=1)
+    assert features.loc[0, "mission"] == "Kepler"
+    assert features.loc[0, "bls_period"] == pytest.approx(2.5, rel=0.01)
+
+
+@pytest.mark.parametrize("baseline", [27.0, 400.0, 1400.0])
+def test_period_grid_scales_with_baseline(baseline):
+    min_duration, oversample = 1.0 / 24.0, 2.0
+    periods = period_grid(baseline, 0.5, 20.0, min_duration, oversample)
+    freqs = 1.0 / periods
+    # El tránsito más corto no se desfasa más de 1/oversample de su duración entre vecinos
+    step = np.abs(np.diff(freqs)) / freqs[1:]
+    assert step.max() <= min_duration / (baseline * oversample) * 1.0001
+    assert periods.min() == pytest.approx(0.5)
+    assert periods.max() == pytest.approx(min(20.0, baseline / 2.0))
+
+
+def test_period_grid_warns_when_clipped(capsys):
+    periods = period_grid(1400.0, 0.5, 20.0, 1.0 / 24.0, 2.0, max_periods=5000)
+    assert periods.size == 5000
+    assert "recortada" in capsys.readouterr().out
+
+
+def test_kepler_long_baseline(tmp_path):
+    """Curva Kepler completa (1400 días): con una rejilla recortada se obtenía el alias P/4."""
+    path = tmp_path / "kepler_long.fits"
+    write_synthetic_lightcurve(str(path), period=3.7, depth=5e-3, duration_hours=3.0, baseline=1400.0,
+                               cadence_minutes=29.4, mission="Kepler", target_id=8, seed=3)
+    # Rango y resolución acotados para que la prueba sea rápida; la rejilla sigue
+    # escalando con los 1400 días de línea base
+    row = extract_one(str(path), {"min_period": 2.5, "max_period": 5.0,
+                                  "min_duration_hours": 3.0, "time_bin_minutes": 120.0})
+    assert row["bls_period"] == pytest.approx(3.7, rel=1e-3)
+    assert row["bls_snr"] > 10
+
+
+def test_join_features_hit_and_miss():
+    catalog = pd.DataFrame({
+        "ra": [10.0, 10.0, 50.0],
+        "dec": [-20.0, -20.0, 5.0],
+        "mission": pd.Categorical(["TESS", "Kepler", "TESS"]),
+    })
+    features = pd.DataFrame({
+        "mission": ["TESS", "TESS"],
+        "ra": [10.0, 50.0],
+        # 0.5" y 10" de separación respecto al catálogo
+        "dec": [-20.0 + 0.5 / 3600.0, 5.0 + 10.0 / 3600.0],
+        **{col: [1.0, 2.0] for col in FEATURE_COLUMNS},
+    })
+
+    joined = join_features(catalog, features, max_sep_arcsec=2.0)
+    assert joined.loc[0, "bls_period"] == 1.0      # misma misión y cerca
+    assert np.isnan(joined.loc[1, "bls_period"])   # otra misión
+    assert np.isnan(joined.loc[2, "bls_period"])   # demasiado lejos